@@ -41,6 +41,8 @@ import inkex
 import datetime as dt
 import re
 import ntpath
+import functools
+from math import atan2, degrees
 
 try:
 	import numpy as np
@@ -50,6 +52,14 @@ try:
 	from lxml import etree
 except:
 	inkex.errormsg('Could not import the lxml library. Please check if the right version of lxml is installed correctly.')
+try:
+	import numba
+except:
+	numba = None# optional, the segment walker falls back to plain python
+try:
+	from edraw_fast import walk_segments as _walk_segments_fast
+except:
+	_walk_segments_fast = None# optional compiled walker, build with 'python setup.py build_ext --inplace'
 
 ns = {
 u'sodipodi' :u'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
@@ -63,6 +73,20 @@ u'xlink'	:u'http://www.w3.org/1999/xlink',
 u'xml'	    :u'http://www.w3.org/XML/1998/namespace'
 }
 
+# precompiled patterns, these are matched once per element in effect()
+_FILL_RE = re.compile(r'fill:(.+?);')
+_COLOR_SEP_RE = re.compile(r'[,\s]+')
+_PATH_TOKEN_RE = re.compile(r'([MmLlHhVvCcSsQqTtAaZz])|(-?\d*\.?\d+(?:[eE][-+]?\d+)?)')
+# translation table that deletes all hex digits, a valid hex color token is left empty
+_HEX_TABLE = str.maketrans('', '', '0123456789ABCDEF')
+# two digit hex strings for every byte value, indexing beats running the format machinery
+_HEX2 = ['%02x' % i for i in range(256)]
+
+# Clark notation attribute keys, formatted once instead of on every element visit
+_LABEL_KEY = '{%s}label' % ns['inkscape']
+_INSENSITIVE_KEY = '{%s}insensitive' % ns['sodipodi']
+_SNAP_KEY = '{%s}snap-grids' % ns['inkscape']
+
 def path_leaf(path):
 	'''
 	Function that will return full filename from a complete path (absolute or relative).
@@ -81,30 +105,6 @@ def path_leaf(path):
 	return tail or ntpath.basename(head)
 
 
-def get_opt_attrib(element, attrib, alt_attrib_val):
-	'''
-	Function that return the attribute of an xml element if this attribute exists, otherwise return a given value.
-	
-	Parameters
-	----------
-	element : xml element
-		element for trying to get attribute
-	attrib : str
-		name of the attribute
-	alt_attrib_val
-		alternative value if attribute of elemet does not exist
-    
-    Returns
-	-------
-	attrib_val
-		value of attribute or alternative value
-	'''
-	try:
-		attrib_val = element.attrib[attrib]
-	except:
-		attrib_val = alt_attrib_val
-	return(attrib_val)
-	
 def get_layer_attribs(svg_layer, color):
 	'''
 	Function that will determine the properties of a svg layer and return these properties as an array.
@@ -126,15 +126,15 @@ def get_layer_attribs(svg_layer, color):
 		array[3] : color of layer in hex #RRGGBB
 		array[4] : alpha of the layer in range [0.,1.]
 	'''
-	name = svg_layer.attrib['{{{inkscape}}}label'.format(**ns)]
+	name = svg_layer.get(_LABEL_KEY)
 	# get layer visibility
-	hidden = get_opt_attrib(svg_layer, 'style', 'false')
+	hidden = svg_layer.get('style', 'false')
 	if hidden =='display:inline':
 		hidden = 'true'
 	else:
 		hidden = 'false'
 	# get layer lock state
-	locked = get_opt_attrib(svg_layer, '{{{sodipodi}}}insensitive'.format(**ns), 'false')
+	locked = svg_layer.get(_INSENSITIVE_KEY, 'false')
 	colorRGB = color[:7]
 	alpha = int(color[-2:],16)/255.#int(color[-2:], 16)/1000.
 	return([name, hidden, locked, colorRGB, alpha])
@@ -153,10 +153,12 @@ def color_string2color_list(color_string):
 	color_list : list
 		list of all colors in hex #RRGGBBAA format
 	'''
-	color_list = re.findall(r'#[0-9A-Fa-f]{8}|#[0-9A-Fa-f]{6}', color_string.upper())
-	for i, c in enumerate(color_list):
-		if len(c)==7:
-			color_list[i] = c + 'FF'
+	color_list = []
+	for tok in _COLOR_SEP_RE.split(color_string.upper()):
+		if len(tok) in (7,9) and tok[0]=='#' and tok[1:].translate(_HEX_TABLE)=='':
+			if len(tok)==7:
+				tok = tok + 'FF'
+			color_list.append(tok)
 	return(color_list)
 	
 def rgba_conv(color):
@@ -173,11 +175,11 @@ def rgba_conv(color):
 	rgba : str
 		color in #RRGGBBAA format
 	'''
-	rgba = '#{:02x}{:02x}{:02x}'.format(color[0],color[1],color[2])
+	rgba = '#' + _HEX2[color[0]] + _HEX2[color[1]] + _HEX2[color[2]]
 	if len(color)==3:
 		rgba += 'FF'
 	else:
-		rgba += '{:02x}'.format(int(color[3]*100))
+		rgba += _HEX2[min(255, max(0, int(color[3]*100)))]
 	return(rgba)
 	
 def get_outl(sty):
@@ -194,7 +196,7 @@ def get_outl(sty):
 	outl : str
 		the element meant as outline or shape 'true' or 'false'
 	'''
-	sty_fill = re.search('fill:(.+?);', sty).group(1)
+	sty_fill = _FILL_RE.search(sty).group(1)
 	if sty_fill != 'none':
 	   outl = 'false'
 	else:
@@ -221,7 +223,7 @@ def gen_style(old_sty, layer_color, layer_alpha):
 	outl : str
 		is element shape or outline ('false' or 'true')
 	'''
-	sty_fill = re.search('fill:(.+?);', old_sty).group(1)
+	sty_fill = _FILL_RE.search(old_sty).group(1)
 	#sty_stroke = re.search('stroke:(.+?);', old_sty).group(1)
 	if sty_fill != 'none':
 	   new_sty = 'fill:{};stroke:none;opacity:{}'.format(layer_color,layer_alpha)
@@ -270,90 +272,346 @@ def area_fast_path(points):
 		inkex.errormsg('Path consists of less than 2 points. The angle can not be calculated and is set to 0 deg.')
 		return('0 deg')
 	else:
-		if (points[2]-points[0])!=0:
-			tan = (points[3]-points[1])/(points[2]-points[0])
-			return('{:.0f} deg'.format(np.rad2deg(np.arctan(tan))))
-		else:
-			return('90 deg')
+		return('{:.0f} deg'.format(degrees(atan2(points[3]-points[1], points[2]-points[0]))))
 		
-def cubic_bezier(cubic_bezier, t):
+def cubic_bezier_basis(t):
 	'''
-	Function that evaluate a cubic bezier curve at t.
-	
+	Function that builds the cubic Bernstein basis matrix for the sampling points t.
+
 	Parameters
 	----------
-	cubic_bezier : svg.path.CubicBezier
-		startpoint, controlpoint1, controlpoint2, endpoint of Cubic Bezier path
-	t : float
-		wherer to evaluate cubic bezier. For 0<=t<=1 the evaluation point will be on the path.
-	
+	t : ndarray
+		sampling points. For 0<=t<=1 the evaluation points will be on the path.
+
     Returns
 	-------
-	complex
-		evaluated point of cubic bezier
-	
+	ndarray
+		(n,4) basis matrix A with A[i,j] the j-th cubic Bernstein polynomial at t[i]. A curve is evaluated as A @ P with P the (4,2) control points
+
 	Note
 	----
 	see https://en.wikipedia.org/wiki/B%C3%A9zier_curve#Cubic_B%C3%A9zier_curves for formula
 	'''
-	b0 = cubic_bezier[1][0]
-	b1 = cubic_bezier[1][1]
-	b2 = cubic_bezier[1][2]
-	b3 = cubic_bezier[1][3]
-	return((-b0+3*b1-3*b2+b3)*t**3+(3*b0-6*b1+3*b2)*t**2 + (-3*b0+3*b1)*t + b0)
-	
-def quadratic_bezier(quadratic_bezier, t):
+	u = 1-t
+	return(np.column_stack([u**3, 3*t*u**2, 3*t**2*u, t**3]))
+
+def quadratic_bezier_basis(t):
 	'''
-	Function that evaluate a quadratic bezier curve at t.
-	
+	Function that builds the quadratic Bernstein basis matrix for the sampling points t.
+
 	Parameters
 	----------
-	quadratic_bezier : svg.path.QuadraticBezier
-		startpoint, controlpoint, endpoint of quadratic Bezier path
-	t : float
-		wherer to evaluate quadratic bezier. For 0<=t<=1 the evaluation point will be on the path.
-	
+	t : ndarray
+		sampling points. For 0<=t<=1 the evaluation points will be on the path.
+
     Returns
 	-------
-	complex
-		evaluated point of quadratic bezier
-	
+	ndarray
+		(n,3) basis matrix A with A[i,j] the j-th quadratic Bernstein polynomial at t[i]. A curve is evaluated as A @ P with P the (3,2) control points
+
 	Note
 	----
 	see https://en.wikipedia.org/wiki/B%C3%A9zier_curve#Quadratic_B%C3%A9zier_curves for formula
 	'''
-	b0 = quadratic_bezier[1][0]
-	b1 = quadratic_bezier[1][1]
-	b2 = quadratic_bezier[1][2]
-	return((b0-2*b1+b2)*t**2 + (-2*b0+2*b1)*t + b0)
-	
-def interpolate_curved_path(path, n=3):
+	u = 1-t
+	return(np.column_stack([u**2, 2*t*u, t**2]))
+
+@functools.lru_cache(maxsize=8)
+def _bern_basis(n):
 	'''
-	Function that interpolate a cubic bezier or quadratic bezier curve at n sampling points
-	
+	Function that returns the sampling points and Bernstein basis matrices for n interpolation points.
+	Cached per n, so every layer and every repeated run with the same num_int_points reuses the same arrays.
+
 	Parameters
 	----------
-	pyth : svg.path type
-		path which should be interpolated
-	n : int, optional
-		points at [0, 1/N, 2/N, ..., (N-1)/N]
-	
+	n : int
+		number of interpolation points
+
     Returns
 	-------
+	tuple
+		sampling points t, cubic basis matrix and quadratic basis matrix
+	'''
+	t = np.linspace(1/n,1,n,endpoint=True)
+	return(t, cubic_bezier_basis(t), quadratic_bezier_basis(t))
+
+@functools.lru_cache(maxsize=8)
+def _point_templates(n):
+	'''
+	Function that returns the repeated printf style templates for formatting n interpolated points.
+	Cached per n so the template strings are concatenated once instead of per curve.
+
+	Parameters
+	----------
+	n : int
+		number of interpolation points
+
+    Returns
+	-------
+	tuple
+		template for the d attribute L commands and template for the ely points list
+	'''
+	return(' L %f,%f' * n, ' (%.3f %.3f)' * n)
+
+def de_casteljau(points, t):
+	'''
+	Function that evaluate a bezier curve of arbitrary degree at all sampling points t with the de Casteljau recurrence.
+	The basis matrix product in interpolate_curved_path is the fast path for the fixed cubic and quadratic cases,
+	this evaluator covers every other degree (e.g. for the planned arc segment interpolation) and is numerically
+	better conditioned near t=0 and t=1 than the monomial form.
+
+	Parameters
+	----------
 	points : list
-		array of complex numbers representing x and y value respectivly
-	'''
-	samples = np.linspace(1/n,1,n,endpoint=True)
-	points = []
-	if path[0]=='C':
-		func = cubic_bezier
-	elif path[0]=='Q':
-		func = quadratic_bezier
-	for t in samples:
-		point = func(path, t)
-		points.append(point)
-	return(points)
-	
+		control points of the curve as (x,y) tuples, one more than the degree
+	t : ndarray
+		sampling points. For 0<=t<=1 the evaluation points will be on the path.
+
+    Returns
+	-------
+	points : ndarray
+		(n,2) array of x and y values of the evaluated points
+
+	Note
+	----
+	see https://en.wikipedia.org/wiki/De_Casteljau%27s_algorithm for the recurrence
+	'''
+	points = np.asarray(points, dtype=float)
+	m = points.shape[0]
+	t = t[:,None,None]
+	W = np.broadcast_to(points, (t.size,)+points.shape).copy()
+	for k in range(1, m):
+		W[:,:m-k] = (1-t)*W[:,:m-k] + t*W[:,1:m-k+1]
+	return(W[:,0])
+
+def interpolate_curved_path(points, basis):
+	'''
+	Function that interpolate a bezier curve at the sampling points baked into the basis matrix
+
+	Parameters
+	----------
+	points : list
+		control points of the curve as (x,y) tuples, degree has to match the basis
+	basis : ndarray
+		Bernstein basis matrix from cubic_bezier_basis or quadratic_bezier_basis
+
+    Returns
+	-------
+	points : ndarray
+		(n,2) array of x and y values of the interpolated points
+	'''
+	return(basis @ np.asarray(points, dtype=float))
+
+# number of parameters each path command consumes
+_CMD_NARGS = {'M':2,'L':2,'H':1,'V':1,'C':6,'S':4,'Q':4,'T':2,'A':7,'Z':0}
+
+def parse_d(d):
+	'''
+	Function that parses the d attribute of a path into [command letter, parameter list] pairs.
+	Same shape and content as Path.to_arrays() used to return, but scanning the string directly
+	instead of building a segment object per command first. Relative commands are converted to
+	their absolute uppercase form by tracking the current point and the subpath start, and
+	repeated parameter groups are expanded into their implicit commands, a moveto with several
+	coordinate pairs continues as lineto.
+
+	Parameters
+	----------
+	d : str
+		d attribute of an svg path
+
+    Returns
+	-------
+	segs : list
+		segments as [command letter, list of float parameters] pairs, all commands absolute uppercase
+	'''
+	segs = []
+	cmd = None
+	nargs = 0
+	buf = []
+	cpx = 0.# current point
+	cpy = 0.
+	spx = 0.# start of the current subpath, Z returns there
+	spy = 0.
+	for m in _PATH_TOKEN_RE.finditer(d):
+		letter = m.group(1)
+		if letter:
+			cmd = letter
+			nargs = _CMD_NARGS[letter.upper()]
+			buf = []
+			if nargs == 0:# Z and z
+				segs.append(['Z', []])
+				cpx = spx
+				cpy = spy
+		elif cmd is not None and nargs > 0:
+			buf.append(float(m.group(2)))
+			if len(buf) == nargs:
+				rel = cmd.islower()
+				cmd_abs = cmd.upper()
+				if cmd_abs == 'H':
+					if rel:
+						buf[0] += cpx
+					cpx = buf[0]
+				elif cmd_abs == 'V':
+					if rel:
+						buf[0] += cpy
+					cpy = buf[0]
+				elif cmd_abs == 'A':# only the endpoint of an arc is a coordinate
+					if rel:
+						buf[5] += cpx
+						buf[6] += cpy
+					cpx = buf[5]
+					cpy = buf[6]
+				else:# M, L, C, S, Q, T consist of coordinate pairs
+					if rel:
+						for k in range(0, nargs, 2):
+							buf[k] += cpx
+							buf[k+1] += cpy
+					cpx = buf[nargs-2]
+					cpy = buf[nargs-1]
+				if cmd_abs == 'M':
+					spx = cpx
+					spy = cpy
+				segs.append([cmd_abs, buf])
+				buf = []
+				if cmd == 'M':
+					cmd = 'L'
+				elif cmd == 'm':
+					cmd = 'l'
+	return(segs)
+
+# numeric command codes for the segment walker, keep in sync with _walk_segments
+_SEG_CODES = {'M':0,'L':1,'H':2,'V':3,'C':4,'S':5,'Q':6,'T':7,'A':8,'Z':9}
+
+def encode_segments(segs):
+	'''
+	Function that encodes the [letter, params] segment pairs into numeric arrays for the compiled walker.
+
+	Parameters
+	----------
+	segs : list
+		segments of a path as [command letter, list of parameters] pairs
+
+    Returns
+	-------
+	codes : ndarray
+		int8 array with one command code per segment (see _SEG_CODES), -1 for unsupported commands
+	params : ndarray
+		(N,7) float array with the segment parameters, padded with zeros
+	'''
+	n = len(segs)
+	codes = np.full(n, -1, dtype=np.int8)
+	params = np.zeros((n,7))
+	for i in range(n):
+		code = _SEG_CODES.get(segs[i][0], -1)
+		codes[i] = code
+		p = segs[i][1]
+		if p:
+			params[i,:len(p)] = p
+	return(codes, params)
+
+def _walk_segments(codes, params):
+	'''
+	Function that resolves the absolute control points of every segment while tracking the current
+	point and the reflected control point for S/T. Only float arithmetic and array indexing, so
+	numba compiles it as is when available.
+
+	Parameters
+	----------
+	codes : ndarray
+		command codes from encode_segments
+	params : ndarray
+		segment parameters from encode_segments
+
+    Returns
+	-------
+	out : ndarray
+		(N,8) float array, per segment the resolved points:
+		M/L/H/V/A : endpoint in out[i,0:2]
+		C/S : four cubic control points in out[i,0:8]
+		Q/T : three quadratic control points in out[i,0:6]
+	'''
+	n = codes.shape[0]
+	out = np.zeros((n,8))
+	PPx = 0.
+	PPy = 0.
+	CCx = 0.
+	CCy = 0.
+	for i in range(n):
+		c = codes[i]
+		if c == 0 or c == 1:# M, L
+			PPx = params[i,0]
+			PPy = params[i,1]
+			out[i,0] = PPx
+			out[i,1] = PPy
+		elif c == 2:# H
+			PPx = params[i,0]
+			out[i,0] = PPx
+			out[i,1] = PPy
+		elif c == 3:# V
+			PPy = params[i,0]
+			out[i,0] = PPx
+			out[i,1] = PPy
+		elif c == 4:# C
+			out[i,0] = PPx
+			out[i,1] = PPy
+			out[i,2] = params[i,0]
+			out[i,3] = params[i,1]
+			CCx = params[i,2]
+			CCy = params[i,3]
+			out[i,4] = CCx
+			out[i,5] = CCy
+			PPx = params[i,4]
+			PPy = params[i,5]
+			out[i,6] = PPx
+			out[i,7] = PPy
+		elif c == 5:# S, reflect the previous control point
+			out[i,0] = PPx
+			out[i,1] = PPy
+			out[i,2] = 2*PPx-CCx
+			out[i,3] = 2*PPy-CCy
+			CCx = params[i,0]
+			CCy = params[i,1]
+			out[i,4] = CCx
+			out[i,5] = CCy
+			PPx = params[i,2]
+			PPy = params[i,3]
+			out[i,6] = PPx
+			out[i,7] = PPy
+		elif c == 6:# Q
+			out[i,0] = PPx
+			out[i,1] = PPy
+			CCx = params[i,0]
+			CCy = params[i,1]
+			out[i,2] = CCx
+			out[i,3] = CCy
+			PPx = params[i,2]
+			PPy = params[i,3]
+			out[i,4] = PPx
+			out[i,5] = PPy
+		elif c == 7:# T, reflect the previous control point
+			out[i,0] = PPx
+			out[i,1] = PPy
+			CCx = 2*PPx-CCx
+			CCy = 2*PPy-CCy
+			out[i,2] = CCx
+			out[i,3] = CCy
+			PPx = params[i,0]
+			PPy = params[i,1]
+			out[i,4] = PPx
+			out[i,5] = PPy
+		elif c == 8:# A, not supported for interpolation yet
+			PPx = params[i,5]
+			PPy = params[i,6]
+			out[i,0] = PPx
+			out[i,1] = PPy
+	return(out)
+
+# prefer the compiled walker, then numba, then the plain python version above
+if _walk_segments_fast is not None:
+	_walk_segments = _walk_segments_fast
+elif numba is not None:
+	_walk_segments = numba.njit(cache=True)(_walk_segments)
+
 def create_ely_tree(filename, grid):
 	'''
 	Function for creating xml tree of the raw ely file structure
@@ -400,6 +658,7 @@ class edraw(inkex.EffectExtension):
 		#pars.add_argument('--flat_trans', type=inkex.Boolean, default=False, help='Try to flatten transformations')
 		pars.add_argument('--calc_rot', type=inkex.Boolean, default=False, help='Calculate scanning direction of polygons by first two points')
 		pars.add_argument('--num_int_points', type=int, default=10, help='Number of points for interpolation of curved path segment')
+		pars.add_argument('--pretty', type=inkex.Boolean, default=False, help='Pretty print the ely file (slower for large drawings)')
 		
 		pars.add_argument('--color_cycle', type=str, default='default', help='which type of color cycle should be used')
 		pars.add_argument('--color_string', type=str, default='#1F77B47F, #FF7F0E7F, #2CA02C7F, #D627287F, #9467BD7F, #8C564B7F, #E377C27F, #7F7F7F7F, #BCBD227F, #17BECF7F', help='text string for colors in #rgb or #rgba notation')
@@ -421,10 +680,15 @@ class edraw(inkex.EffectExtension):
 		except:
 			grid = None
 		namedview = self.svg.xpath('//sodipodi:namedview')[0]
-		g_xdist = get_opt_attrib(grid, 'spacingx', '1')
-		g_ydist = get_opt_attrib(grid, 'spacingy', '1')
-		g_vis = get_opt_attrib(grid, 'visible', 'true')
-		g_snap = get_opt_attrib(namedview, '{{{inkscape}}}snap-grids'.format(**ns), 'true')
+		if grid is not None:
+			g_xdist = grid.get('spacingx', '1')
+			g_ydist = grid.get('spacingy', '1')
+			g_vis = grid.get('visible', 'true')
+		else:
+			g_xdist = '1'
+			g_ydist = '1'
+			g_vis = 'true'
+		g_snap = namedview.get(_SNAP_KEY, 'true')
 		return([g_xdist,g_ydist,g_vis,g_snap])
 		
 	def get_size(self):
@@ -439,6 +703,11 @@ class edraw(inkex.EffectExtension):
 		This method will iterate of all svg layers and their elements and parsing them to an .ely file. The apperance of inkscape document will be adapted respectively
 		'''
 		num_int_points = self.options.num_int_points
+		if num_int_points < 1:
+			num_int_points = 1# curves collapse to their endpoint, documents without curves are unaffected
+		# sampling points and Bernstein basis matrices for curve interpolation, fixed for the whole document
+		t_samples, A_cub, A_quad = _bern_basis(num_int_points)
+		tmpl_L, tmpl_P = _point_templates(num_int_points)
 		apply_on_svg = self.options.apply_on_svg
 		calc_rot = self.options.calc_rot
 		
@@ -468,133 +737,153 @@ class edraw(inkex.EffectExtension):
 			for c in [self.options.col1[:], self.options.col2[:], self.options.col3[:], self.options.col4[:], self.options.col5[:]]:
 				color_cycle.append(rgba_conv(c))
 		
+		# paths are collected first so all curves of the document can be evaluated in one batch
+		path_jobs = []
+		cub_controls = []
+		quad_controls = []
+		
 		for i, svg_layer in enumerate(svg_layer_list):
 			layer_color = color_cycle[i % len(color_cycle)]
 			svg_layer_attribs = get_layer_attribs(svg_layer, layer_color)
-			ely_layer = etree.SubElement(ely_layer_list, 'LAYER', fill_color=svg_layer_attribs[3], fill_opacity=str(svg_layer_attribs[4]), hidden=svg_layer_attribs[1], locked=svg_layer_attribs[2], name=svg_layer_attribs[0])
-			ely_layer_reference = etree.SubElement(ely_structure, 'LAYER_REFERENCE', frame_cx=str(size/2.), frame_cy=str(size/2.), frame_size=str(size), ref=svg_layer_attribs[0])
+			style_cache = {}# styles tend to repeat across elements of a layer
+			ely_layer = etree.SubElement(ely_layer_list, 'LAYER', attrib={'fill_color':svg_layer_attribs[3], 'fill_opacity':str(svg_layer_attribs[4]), 'hidden':svg_layer_attribs[1], 'locked':svg_layer_attribs[2], 'name':svg_layer_attribs[0]})
+			ely_layer_reference = etree.SubElement(ely_structure, 'LAYER_REFERENCE', attrib={'frame_cx':str(size/2.), 'frame_cy':str(size/2.), 'frame_size':str(size), 'ref':svg_layer_attribs[0]})
 			
-			svg_rects = svg_layer.findall('.//svg:rect')
-			svg_ellipses = svg_layer.findall('.//svg:ellipse')
-			svg_circles = svg_layer.findall('.//svg:circle')
-			svg_paths = svg_layer.xpath('.//svg:path[@d]')
-			for svg_rect in svg_rects:
-				x, y, h, w, s = [svg_rect.attrib[atr] for atr in ['x','y','height','width','style']]
-				ns, o = gen_style(s, svg_layer_attribs[3], svg_layer_attribs[4])
-				a = area_fast_rect(w,h)
-				etree.SubElement(ely_layer_reference, 'RECT', outline=o, area_fast=a, height=h, width=w, x=x, y=y)
-				if apply_on_svg:
-					svg_rect.attrib['style'] = ns
-				
-			for svg_ellipse in svg_ellipses:
-				rx, ry, cx, cy, s = [svg_ellipse.attrib[atr] for atr in ['rx','ry','cx','cy','style']]
-				ns, o = gen_style(s, svg_layer_attribs[3], svg_layer_attribs[4])
-				a = area_fast_rect(rx,ry)
-				etree.SubElement(ely_layer_reference, 'ELLIPSE', outline=o, area_fast=a, rx=rx, ry=ry, cx=cx, cy=cy)
-				if apply_on_svg:
-					svg_ellipse.attrib['style'] = ns
-				
-			for svg_circle in svg_circles:
-				r, cx, cy, s = [svg_circle.attrib[atr] for atr in ['r','cx','cy','style']]
-				ns, o = gen_style(s, svg_layer_attribs[3], svg_layer_attribs[4])
-				a = '0 deg'
-				etree.SubElement(ely_layer_reference, 'CIRCLE', outline=o, area_fast=a, cx=cx, cy=cy, r=r)
-				if apply_on_svg:
-					svg_circle.attrib['style'] = ns
-				
-			for svg_path in svg_paths:
-				d, s = [svg_path.attrib[atr] for atr in ['d','style']]
-				segs = svg_path.path.to_arrays()
-							
-				PP = 0j
-				CC = 0j
-				newp = ''
-				points2 = ''
-				
-				for i in range(len(segs)):
-					if segs[i][0] == 'M':
-						PP = complex(segs[i][1][0],segs[i][1][1])
-						newp += 'M {:f},{:f}'.format(PP.real,PP.imag)
-						points2 += '({:.3f} {:.3f})'.format(PP.real,PP.imag)
-					elif segs[i][0] == 'L':
-						PP = complex(segs[i][1][0],segs[i][1][1])
-						newp += ' L {:f},{:f}'.format(PP.real,PP.imag)
-						points2 += ' ({:.3f} {:.3f})'.format(PP.real,PP.imag)
-					elif segs[i][0] == 'H':
-						PP = complex(segs[i][1][0],PP.imag)
-						newp += ' L {:f},{:f}'.format(PP.real,PP.imag)
-						points2 += ' ({:.3f} {:.3f})'.format(PP.real,PP.imag)
-					elif segs[i][0] == 'V':
-						PP = complex(PP.real,segs[i][1][0])
-						newp += ' L {:f},{:f}'.format(PP.real,PP.imag)
-						points2 += ' ({:.3f} {:.3f})'.format(PP.real,PP.imag)
-					elif segs[i][0] == 'C':
-						seg_s = PP
-						seg_c1 = segs[i][1][0]+segs[i][1][1]*1j
-						CC = complex(segs[i][1][2],segs[i][1][3])
-						seg_c2 = CC
-						PP = complex(segs[i][1][4],segs[i][1][5])
-						seg_e = PP
-						ipoints = interpolate_curved_path(['C',[seg_s,seg_c1,seg_c2,seg_e]], n=num_int_points)
-						newp += ' L '+' L '.join(['{:f},{:f}'.format(x.real, x.imag) for x in ipoints])
-						points2 += ' '+' '.join(['({:.3f} {:.3f})'.format(x.real, x.imag) for x in ipoints])
-					elif segs[i][0] == 'S':
-						seg_s = PP
-						seg_c1 = 2*PP-CC
-						CC = complex(segs[i][1][0],segs[i][1][1])
-						seg_c2 = CC
-						PP = complex(segs[i][1][2],segs[i][1][3])
-						seg_e = PP
-						ipoints = interpolate_curved_path(['C',[seg_s,seg_c1,seg_c2,seg_e]], n=num_int_points)
-						newp += ' L '+' L '.join(['{:f},{:f}'.format(x.real, x.imag) for x in ipoints])
-						points2 += ' '+' '.join(['({:.3f} {:.3f})'.format(x.real, x.imag) for x in ipoints])
-					elif segs[i][0] == 'Q':
-						seg_s = PP
-						CC = complex(segs[i][1][0],segs[i][1][1])
-						seg_c = CC
-						PP = complex(segs[i][1][2],segs[i][1][3])
-						seg_e = PP
-						ipoints = interpolate_curved_path(['Q',[seg_s,seg_c,seg_e]], n=num_int_points)
-						newp += ' L '+' L '.join(['{:f},{:f}'.format(x.real, x.imag) for x in ipoints])
-						points2 += ' '+' '.join(['({:.3f} {:.3f})'.format(x.real, x.imag) for x in ipoints])
-					elif segs[i][0] == 'T':
-						seg_s = PP
-						CC = 2*PP-CC
-						seg_c = CC
-						PP = complex(segs[i][1][0],segs[i][1][1])
-						seg_e = PP
-						ipoints = interpolate_curved_path(['Q',[seg_s,seg_c,seg_e]], n=num_int_points)
-						newp += ' L '+' L '.join(['{:f},{:f}'.format(x.real, x.imag) for x in ipoints])
-						points2 += ' '+' '.join(['({:.3f} {:.3f})'.format(x.real, x.imag) for x in ipoints])
-					elif segs[i][0] == 'A':# not supported for interpolation yet
-						PP = complex(segs[i][1][5],segs[i][1][6])
-						newp += ' L {:f},{:f}'.format(PP.real,PP.imag)
-						points2 += ' ({:.3f} {:.3f})'.format(PP.real,PP.imag)
-					elif segs[i][0] == 'Z':
-						newp += ' Z'
-						closed = True
-					else:
-						pass
-					
-				angle_points = re.findall(r'[-+]?\d*\.\d+|\d+', newp)
-				angle_points = np.array(angle_points,dtype=float)
+			svg_elements = svg_layer.xpath('.//svg:rect|.//svg:ellipse|.//svg:circle|.//svg:path[@d]')
+			for svg_element in svg_elements:
+				tag = svg_element.tag.rsplit('}',1)[-1]
+				if tag == 'rect':
+					x = svg_element.get('x')
+					y = svg_element.get('y')
+					h = svg_element.get('height')
+					w = svg_element.get('width')
+					s = svg_element.get('style')
+					ns, o = style_cache.get(s, (None,None))
+					if ns is None:
+						ns, o = gen_style(s, svg_layer_attribs[3], svg_layer_attribs[4])
+						style_cache[s] = (ns, o)
+					a = area_fast_rect(w,h)
+					etree.SubElement(ely_layer_reference, 'RECT', attrib={'outline':o, 'area_fast':a, 'height':h, 'width':w, 'x':x, 'y':y})
+					if apply_on_svg:
+						svg_element.attrib['style'] = ns
+				elif tag == 'ellipse':
+					rx = svg_element.get('rx')
+					ry = svg_element.get('ry')
+					cx = svg_element.get('cx')
+					cy = svg_element.get('cy')
+					s = svg_element.get('style')
+					ns, o = style_cache.get(s, (None,None))
+					if ns is None:
+						ns, o = gen_style(s, svg_layer_attribs[3], svg_layer_attribs[4])
+						style_cache[s] = (ns, o)
+					a = area_fast_rect(rx,ry)
+					etree.SubElement(ely_layer_reference, 'ELLIPSE', attrib={'outline':o, 'area_fast':a, 'rx':rx, 'ry':ry, 'cx':cx, 'cy':cy})
+					if apply_on_svg:
+						svg_element.attrib['style'] = ns
+				elif tag == 'circle':
+					r = svg_element.get('r')
+					cx = svg_element.get('cx')
+					cy = svg_element.get('cy')
+					s = svg_element.get('style')
+					ns, o = style_cache.get(s, (None,None))
+					if ns is None:
+						ns, o = gen_style(s, svg_layer_attribs[3], svg_layer_attribs[4])
+						style_cache[s] = (ns, o)
+					a = '0 deg'
+					etree.SubElement(ely_layer_reference, 'CIRCLE', attrib={'outline':o, 'area_fast':a, 'cx':cx, 'cy':cy, 'r':r})
+					if apply_on_svg:
+						svg_element.attrib['style'] = ns
+				else:# path
+					d = svg_element.get('d')
+					s = svg_element.get('style')
+					segs = parse_d(d)
+					codes, seg_params = encode_segments(segs)
+					resolved = _walk_segments(codes, seg_params)
+					for j in range(codes.shape[0]):
+						c = codes[j]
+						if c == 4 or c == 5:
+							cub_controls.append(resolved[j,0:8].reshape(4,2))
+						elif c == 6 or c == 7:
+							quad_controls.append(resolved[j,0:6].reshape(3,2))
+					path_jobs.append((svg_element, ely_layer_reference, s, svg_layer_attribs, style_cache, codes, resolved))
 				
-				if calc_rot:
-					a = area_fast_path(angle_points)
+		
+		# one batched product per degree evaluates every collected curve at once
+		if cub_controls:
+			pts_cub = np.einsum('ij,kjd->kid', A_cub, np.stack(cub_controls))
+		if quad_controls:
+			pts_quad = np.einsum('ij,kjd->kid', A_quad, np.stack(quad_controls))
+		kc = 0
+		kq = 0
+		
+		for svg_element, ely_layer_reference, s, svg_layer_attribs, style_cache, codes, resolved in path_jobs:
+			closed = False
+			newp_parts = []
+			points2_parts = []
+			first_points = []
+			
+			for i in range(codes.shape[0]):
+				c = codes[i]
+				if c == 0:# M
+					newp_parts.append('M {:f},{:f}'.format(resolved[i,0],resolved[i,1]))
+					points2_parts.append('({:.3f} {:.3f})'.format(resolved[i,0],resolved[i,1]))
+					if len(first_points)<4:
+						first_points.extend(resolved[i,0:2])
+				elif c == 1 or c == 2 or c == 3 or c == 8:# L, H, V and A endpoints
+					newp_parts.append(' L {:f},{:f}'.format(resolved[i,0],resolved[i,1]))
+					points2_parts.append(' ({:.3f} {:.3f})'.format(resolved[i,0],resolved[i,1]))
+					if len(first_points)<4:
+						first_points.extend(resolved[i,0:2])
+				elif c == 4 or c == 5:# C and S, take the next batch evaluated cubic
+					ipoints = pts_cub[kc]
+					kc += 1
+					flat = np.empty(2*num_int_points)
+					flat[0::2] = ipoints[:,0]
+					flat[1::2] = ipoints[:,1]
+					flat = tuple(flat.tolist())
+					newp_parts.append(tmpl_L % flat)
+					points2_parts.append(tmpl_P % flat)
+					if len(first_points)<4:
+						first_points.extend(flat[:4-len(first_points)])
+				elif c == 6 or c == 7:# Q and T, take the next batch evaluated quadratic
+					ipoints = pts_quad[kq]
+					kq += 1
+					flat = np.empty(2*num_int_points)
+					flat[0::2] = ipoints[:,0]
+					flat[1::2] = ipoints[:,1]
+					flat = tuple(flat.tolist())
+					newp_parts.append(tmpl_L % flat)
+					points2_parts.append(tmpl_P % flat)
+					if len(first_points)<4:
+						first_points.extend(flat[:4-len(first_points)])
+				elif c == 9:# Z
+					newp_parts.append(' Z')
+					closed = True
 				else:
-					a = '0 deg'
-				if closed:
+					pass
+			
+			newp = ''.join(newp_parts)
+			points2 = ''.join(points2_parts)
+			
+			if calc_rot:
+				a = area_fast_path(first_points)
+			else:
+				a = '0 deg'
+			if closed:
+				ns, o = style_cache.get(s, (None,None))
+				if ns is None:
 					ns, o = gen_style(s, svg_layer_attribs[3], svg_layer_attribs[4])
-					etree.SubElement(ely_layer_reference, 'POLYGON', outline=o, area_fast=a, points=points2)
-				else:
-					ns = 'fill:none;stroke:{};stroke-width:1;opacity:{}'.format(svg_layer_attribs[3], svg_layer_attribs[4])
-					etree.SubElement(ely_layer_reference, 'LINES', points=points2)
-				if apply_on_svg:
-					svg_path.attrib['style'] = ns
-					svg_path.attrib['d'] = newp
-				
+					style_cache[s] = (ns, o)
+				etree.SubElement(ely_layer_reference, 'POLYGON', attrib={'outline':o, 'area_fast':a, 'points':points2})
+			else:
+				ns = 'fill:none;stroke:{};stroke-width:1;opacity:{}'.format(svg_layer_attribs[3], svg_layer_attribs[4])
+				etree.SubElement(ely_layer_reference, 'LINES', attrib={'points':points2})
+			if apply_on_svg:
+				svg_element.attrib['style'] = ns
+				svg_element.attrib['d'] = newp
+		
 		#inkex.errormsg(etree.tostring(ely_xml,pretty_print=True).decode())#control output
-		ely_xml.write(ep_directory, pretty_print=True, xml_declaration=True, encoding="utf-8")
+		ely_xml.write(ep_directory, pretty_print=self.options.pretty, xml_declaration=True, encoding="utf-8")
 		
 	
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+'''
+Compiled fast path for the segment state machine of the edraw extension.
+
+Build in place with
+
+	python setup.py build_ext --inplace
+
+edraw.py picks this module up automatically and falls back to numba or the
+plain python walker when it is missing, so building it is optional.
+
+This file has to stay in sync with _walk_segments and _SEG_CODES in edraw.py.
+'''
+
+import numpy as np
+
+def walk_segments(signed char[::1] codes, double[:, ::1] params):
+	'''
+	Function that resolves the absolute control points of every segment while tracking the current
+	point and the reflected control point for S/T. Same contract as _walk_segments in edraw.py,
+	with typed locals instead of interpreted bytecode.
+
+	Parameters
+	----------
+	codes : ndarray
+		command codes from encode_segments
+	params : ndarray
+		segment parameters from encode_segments
+
+    Returns
+	-------
+	out : ndarray
+		(N,8) float array, per segment the resolved points:
+		M/L/H/V/A : endpoint in out[i,0:2]
+		C/S : four cubic control points in out[i,0:8]
+		Q/T : three quadratic control points in out[i,0:6]
+	'''
+	cdef Py_ssize_t n = codes.shape[0]
+	out_arr = np.zeros((n,8))
+	cdef double[:, ::1] out = out_arr
+	cdef double PPx = 0.
+	cdef double PPy = 0.
+	cdef double CCx = 0.
+	cdef double CCy = 0.
+	cdef Py_ssize_t i
+	cdef signed char c
+	for i in range(n):
+		c = codes[i]
+		if c == 0 or c == 1:# M, L
+			PPx = params[i,0]
+			PPy = params[i,1]
+			out[i,0] = PPx
+			out[i,1] = PPy
+		elif c == 2:# H
+			PPx = params[i,0]
+			out[i,0] = PPx
+			out[i,1] = PPy
+		elif c == 3:# V
+			PPy = params[i,0]
+			out[i,0] = PPx
+			out[i,1] = PPy
+		elif c == 4:# C
+			out[i,0] = PPx
+			out[i,1] = PPy
+			out[i,2] = params[i,0]
+			out[i,3] = params[i,1]
+			CCx = params[i,2]
+			CCy = params[i,3]
+			out[i,4] = CCx
+			out[i,5] = CCy
+			PPx = params[i,4]
+			PPy = params[i,5]
+			out[i,6] = PPx
+			out[i,7] = PPy
+		elif c == 5:# S, reflect the previous control point
+			out[i,0] = PPx
+			out[i,1] = PPy
+			out[i,2] = 2*PPx-CCx
+			out[i,3] = 2*PPy-CCy
+			CCx = params[i,0]
+			CCy = params[i,1]
+			out[i,4] = CCx
+			out[i,5] = CCy
+			PPx = params[i,2]
+			PPy = params[i,3]
+			out[i,6] = PPx
+			out[i,7] = PPy
+		elif c == 6:# Q
+			out[i,0] = PPx
+			out[i,1] = PPy
+			CCx = params[i,0]
+			CCy = params[i,1]
+			out[i,2] = CCx
+			out[i,3] = CCy
+			PPx = params[i,2]
+			PPy = params[i,3]
+			out[i,4] = PPx
+			out[i,5] = PPy
+		elif c == 7:# T, reflect the previous control point
+			out[i,0] = PPx
+			out[i,1] = PPy
+			CCx = 2*PPx-CCx
+			CCy = 2*PPy-CCy
+			out[i,2] = CCx
+			out[i,3] = CCy
+			PPx = params[i,0]
+			PPy = params[i,1]
+			out[i,4] = PPx
+			out[i,5] = PPy
+		elif c == 8:# A, not supported for interpolation yet
+			PPx = params[i,5]
+			PPy = params[i,6]
+			out[i,0] = PPx
+			out[i,1] = PPy
+	return(out_arr)
@@ -0,0 +1,14 @@
+'''
+Optional build script for the compiled segment walker.
+
+	python setup.py build_ext --inplace
+
+The extension works without it, edraw.py falls back to numba or plain python.
+'''
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+	name='edraw_fast',
+	ext_modules=cythonize('edraw_fast.pyx'),
+)
@@ -0,0 +1,37 @@
+'''
+Tests for the edraw inkscape extension. Run with pytest, an inkscape python
+environment (or an installed inkex package) is required since edraw.py imports inkex.
+'''
+
+import pytest
+
+inkex = pytest.importorskip('inkex')
+
+from edraw import parse_d
+
+
+def test_parse_d_absolute():
+	segs = parse_d('M 0,0 L 1,2 C 1,2 3,2 4,0 Z')
+	assert segs == [['M', [0.0, 0.0]], ['L', [1.0, 2.0]], ['C', [1.0, 2.0, 3.0, 2.0, 4.0, 0.0]], ['Z', []]]
+
+
+def test_parse_d_relative():
+	# relative commands are inkscape's default output and have to come out absolutized
+	segs = parse_d('m 10,10 c 5,0 10,5 10,10 l 5,5 z')
+	assert segs == [['M', [10.0, 10.0]], ['C', [15.0, 10.0, 20.0, 15.0, 20.0, 20.0]], ['L', [25.0, 25.0]], ['Z', []]]
+
+
+def test_parse_d_relative_h_v_a():
+	segs = parse_d('m 1,1 h 2 v 3 a 2,2 0 0 1 3,4')
+	assert segs == [['M', [1.0, 1.0]], ['H', [3.0]], ['V', [4.0]], ['A', [2.0, 2.0, 0.0, 0.0, 1.0, 6.0, 8.0]]]
+
+
+def test_parse_d_implicit_lineto():
+	# extra coordinate pairs after a moveto continue as lineto, relative pairs keep chaining
+	assert parse_d('M 0,0 1,2 2,0') == [['M', [0.0, 0.0]], ['L', [1.0, 2.0]], ['L', [2.0, 0.0]]]
+	assert parse_d('m 0,0 1,1 2,2') == [['M', [0.0, 0.0]], ['L', [1.0, 1.0]], ['L', [3.0, 3.0]]]
+
+
+def test_parse_d_z_returns_to_subpath_start():
+	segs = parse_d('M 0,0 l 5,0 z l 2,3')
+	assert segs == [['M', [0.0, 0.0]], ['L', [5.0, 0.0]], ['Z', []], ['L', [2.0, 3.0]]]